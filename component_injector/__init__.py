@@ -1,7 +1,7 @@
 import contextvars
 import functools
 import inspect
-from types import TracebackType
+from types import CodeType, TracebackType
 from typing import (
     Any,
     Callable,
@@ -10,13 +10,12 @@ from typing import (
     Type,
     TypeVar,
     cast,
-    Set,
     List,
     Iterable,
     Awaitable,
     Tuple,
-    NamedTuple,
 )
+from weakref import WeakKeyDictionary
 
 __all__ = ["Injector"]
 
@@ -25,10 +24,18 @@ T = TypeVar("T")
 ComponentMap = Dict[Type[T], T]
 
 
-class Factory(NamedTuple):
-    factory: Optional[Callable[[], Any]]
-    resolved_types: Set[Type]
-    context: Optional["Context"] = None
+class Factory:
+    __slots__ = ["factory", "resolved_types", "context"]
+
+    def __init__(
+        self,
+        factory: Optional[Callable[[], Any]],
+        resolved_types: Tuple[Type, ...],
+        context: Optional["Context"] = None,
+    ) -> None:
+        self.factory = factory
+        self.resolved_types = resolved_types
+        self.context = context
 
 
 FactoryMap = Dict[Type[T], Factory]
@@ -37,56 +44,164 @@ UNSET = object()
 
 
 class ComponentStack:
-    __slots__ = ["_layers", "layer"]
-
-    def __init__(self, layers: Optional[List[ComponentMap]] = None) -> None:
-        if layers is None:
-            layers = [{}]
-        self._layers = layers
-        self.layer = layers[0]
+    __slots__ = ["_parent", "layer", "_version", "_changed", "_view"]
+
+    _view: Tuple[Optional[object], Optional[ComponentMap], object, ComponentMap]
+
+    def __init__(self, parent: Optional["ComponentStack"] = None) -> None:
+        self._parent = parent
+        self.layer: ComponentMap = {}
+        # Replaced whenever our own layer changes.
+        self._changed = object()
+        if parent is None:
+            # The version is shared with all stacked copies and replaced
+            # on every write, invalidating their flattened views.
+            self._version = [object()]
+            self._view = (None, None, self._changed, {})
+        else:
+            self._version = parent._version
+            # Flattened views are replaced rather than updated, so we can
+            # share our parent's until either of us is written to.
+            flat = parent._flatten()
+            self._view = (parent._view[0], flat, self._changed, flat)
+
+    def _flatten(self) -> ComponentMap:
+        # The returned view may be shared with other stacks, never modify
+        # it. The view is a (version, parent's view, changed, flattened
+        # components) tuple so they're all read and replaced together.
+        version = self._version[0]
+        view = self._view
+        if view[0] is version:
+            return view[3]
+
+        # Walk up to the closest stack with an up to date view and
+        # revalidate the views from there on down. Only the views of
+        # stacks that changed, or whose parent's view changed, have to
+        # be rebuilt.
+        stale = []
+        stack: Optional[ComponentStack] = self
+        while stack is not None and stack._view[0] is not version:
+            stale.append(stack)
+            stack = stack._parent
+
+        base = None if stack is None else stack._view[3]
+        for stack in reversed(stale):
+            changed = stack._changed
+            _, view_base, view_changed, flat = stack._view
+            if view_base is not base or view_changed is not changed:
+                layer = stack.layer
+                if base is not None and not layer:
+                    flat = base
+                else:
+                    flat = {} if base is None else base.copy()
+                    # Take a snapshot, another thread may be writing to
+                    # the layer (f.e. the root stack's) in the meantime.
+                    for key, value in list(layer.items()):
+                        if value is UNSET:
+                            flat.pop(key, None)
+                        else:
+                            flat[key] = value
+            stack._view = (version, base, changed, flat)
+            base = flat
+        return cast(ComponentMap, base)
+
+    def _touch(self) -> None:
+        self._changed = object()
+        self._version[0] = object()
 
     def stack(self) -> "ComponentStack":
-        return ComponentStack([{}, *self._layers])
+        return ComponentStack(self)
+
+    def get(self, key: Type[T], default: Any = None) -> Any:
+        version, _, _, flat = self._view
+        if version is not self._version[0]:
+            flat = self._flatten()
+        return flat.get(key, default)
+
+    def __contains__(self, key: Type[T]) -> bool:
+        return self.get(key, UNSET) is not UNSET
 
     def __getitem__(self, key: Type[T]) -> T:
-        for layer in self._layers:
-            if key in layer:
-                value = layer[key]
-                if value is UNSET:
-                    raise KeyError(key)
-                return cast(T, value)
-        raise KeyError(key)
+        value = self.get(key, UNSET)
+        if value is UNSET:
+            raise KeyError(key)
+        return cast(T, value)
 
     def __setitem__(self, key: Type[T], value: T) -> None:
         self.layer[key] = value
+        self._touch()
 
     def __delitem__(self, key: Type[T]) -> None:
-        self.layer[key] = UNSET
+        self.discard((key,))
 
     def update(self, values: ComponentMap) -> None:
         self.layer.update(values)
+        self._touch()
+
+    def fill(self, keys: Iterable[Type[T]], value: T) -> None:
+        layer = self.layer
+        for key in keys:
+            layer[key] = value
+        self._touch()
+
+    def discard(self, keys: Iterable[Type[T]]) -> None:
+        layer = self.layer
+        if self._parent is not None:
+            # Mask whatever the outer stacks provide for these keys.
+            for key in keys:
+                layer[key] = UNSET
+        else:
+            # There's nothing to hide below the root stack, so don't leave
+            # tombstones behind there.
+            removed = False
+            for key in keys:
+                if layer.pop(key, UNSET) is not UNSET:
+                    removed = True
+            if not removed:
+                return
+        self._touch()
 
 
 class Context:
-    __slots__ = ["_current_context", "_factories", "_components", "_tokens"]
+    __slots__ = [
+        "_get_current",
+        "_set_current",
+        "_reset_current",
+        "_factories",
+        "_factories_shared",
+        "_components",
+        "_tokens",
+    ]
 
     _factories: FactoryMap
+    _factories_shared: bool
     _components: ComponentStack
     _tokens: List[Any]
 
     def __init__(self, other: Optional["Context"] = None) -> None:
         if other is None:
-            self._current_context = contextvars.ContextVar("Context", default=self)
+            # Only the bound accessors of the context var are kept, saving
+            # an attribute lookup whenever the current context is needed.
+            current_context = contextvars.ContextVar("Context", default=self)
+            self._get_current = current_context.get
+            self._set_current = current_context.set
+            self._reset_current = current_context.reset
             self._factories = {}
+            self._factories_shared = False
             self._components = ComponentStack()
         else:
-            self._current_context = other._current_context
-            self._factories = other.factories.copy()
-            self._components = other.components.stack()
+            current = other.current
+            self._get_current = other._get_current
+            self._set_current = other._set_current
+            self._reset_current = other._reset_current
+            # Share the factories until either scope registers a new one.
+            self._factories = current._factories
+            self._factories_shared = current._factories_shared = True
+            self._components = current._components.stack()
         self._tokens = []
 
     def __enter__(self) -> "Context":
-        self._tokens.append(self._current_context.set(self))
+        self._tokens.append(self._set_current(self))
         return self
 
     def __exit__(
@@ -95,11 +210,11 @@ class Context:
         exc_val: Optional[Exception],
         traceback: Optional[TracebackType],
     ) -> None:
-        self._current_context.reset(self._tokens.pop())
+        self._reset_current(self._tokens.pop())
 
     @property
     def current(self) -> "Context":
-        return self._current_context.get()
+        return self._get_current()
 
     @property
     def components(self) -> ComponentStack:
@@ -109,6 +224,59 @@ class Context:
     def factories(self) -> FactoryMap:
         return self.current._factories
 
+    def own_factories(self) -> FactoryMap:
+        """
+        Return the current scope's factories for updating, copying them
+        first if they're still shared with another scope.
+        """
+
+        current = self.current
+        if current._factories_shared:
+            current._factories = current._factories.copy()
+            current._factories_shared = False
+        return current._factories
+
+
+_signatures: "WeakKeyDictionary[Callable[..., Any], inspect.Signature]" = (
+    WeakKeyDictionary()
+)
+
+
+def _get_signature(f: Callable[..., Any]) -> inspect.Signature:
+    try:
+        return _signatures[f]
+    except (KeyError, TypeError):
+        pass
+
+    sig = inspect.signature(f)
+    try:
+        _signatures[f] = sig
+    except TypeError:
+        # Not every callable can be weakly referenced.
+        pass
+    return sig
+
+
+_bases: "WeakKeyDictionary[type, Tuple[type, ...]]" = WeakKeyDictionary()
+
+
+def _get_bases(type_: type) -> Tuple[type, ...]:
+    # All the base classes of a type, except the type itself and object.
+    # Unlike callables, classes can always be weakly referenced.
+    try:
+        return _bases[type_]
+    except KeyError:
+        pass
+
+    bases = tuple(base for base in type_.__mro__ if base not in (type_, object))
+    _bases[type_] = bases
+    return bases
+
+
+@functools.lru_cache(maxsize=None)
+def _compile_source(source: str) -> CodeType:
+    return compile(source, "<component_injector>", "exec")
+
 
 class Injector:
     """
@@ -142,27 +310,32 @@ class Injector:
         overwrite_bases: bool = True,
         persistent: bool = True,
     ) -> Factory:
-        factories: FactoryMap = self._context.factories
+        factories: FactoryMap = self._context.own_factories()
         components: ComponentStack = self._context.components
 
+        # Work out the resolved types up front so the factory doesn't
+        # change after it's been created.
+        walk_bases = bases and hasattr(type_, "__mro__")
+        resolved_types: Tuple[Type, ...]
+        if not walk_bases:
+            resolved_types = (type_,)
+        elif overwrite_bases:
+            resolved_types = (type_, *_get_bases(type_))
+        else:
+            resolved_types = (type_,) + tuple(
+                base for base in _get_bases(type_) if base not in factories
+            )
+
         if persistent:
-            factory = Factory(factory_function, {type_}, self._context.current)
+            factory = Factory(factory_function, resolved_types, self._context.current)
         else:
-            factory = Factory(factory_function, {type_})
-        factories[type_] = factory
+            factory = Factory(factory_function, resolved_types)
 
-        if bases and hasattr(type_, "__mro__"):
-            types = type_.mro()
-            for type_ in types:
-                if type_ is object:
-                    continue
-                apply = overwrite_bases or type_ not in factories
-                if inspect.isclass(type_) and apply:
-                    factory.resolved_types.add(type_)
-                    factories[type_] = factory
+        for resolved_type in resolved_types:
+            factories[resolved_type] = factory
 
-                    if overwrite_bases:
-                        del components[type_]
+        if walk_bases and overwrite_bases:
+            components.discard(resolved_types)
 
         return factory
 
@@ -200,10 +373,10 @@ class Injector:
         """
 
         if type_ is None:
-            if inspect.isclass(factory):
+            if isinstance(factory, type):
                 type_ = cast(Type[Any], factory)
             else:
-                type_ = inspect.signature(factory).return_annotation
+                type_ = _get_signature(factory).return_annotation
 
                 if isinstance(type_, str):
                     resolved_type = self._resolve_type(factory, type_)
@@ -259,79 +432,88 @@ class Injector:
             type_, None, bases=bases, overwrite_bases=overwrite_bases
         )
 
-        with self._get_factory_context(factory) as context:
-            context.components.update(
-                {type_: component for type_ in factory.resolved_types}
-            )
+        context = self._get_factory_context(factory)
+        context._components.fill(factory.resolved_types, component)
 
-    def get_component(self, type_: Type[T]) -> T:
-        """
-        Get a component from the injector's current scope. Materialize
-        it using a factory if necessary.
+    def _materialize(self, context: Context, factory: Factory) -> Any:
+        # Call the factory with its scope as the current context and store
+        # the component there. Switches the context var directly instead
+        # of going through the Context's context manager.
+        assert factory.factory is not None
 
-        Note that it is an error to use this function to get a
-        component that has a factory that returns an `Awaitable`.
+        scope = factory.context or context
+        previous = scope._get_current()
+        scope._set_current(scope)
+        try:
+            component = factory.factory()
 
-        :param type_: The type of the component to return.
-        :return: The materialized component.
-        """
+            assert not inspect.isawaitable(
+                component
+            ), "Using an awaitable factory in synchronous code."
+        finally:
+            scope._set_current(previous)
 
-        components = self._context.components
-        try:
-            return components[type_]
-        except KeyError:
-            pass
+        scope._components.fill(factory.resolved_types, component)
+        return component
 
-        factory = self._context.factories[type_]
+    async def _materialize_async(self, context: Context, factory: Factory) -> Any:
         assert factory.factory is not None
 
-        with self._get_factory_context(factory) as context:
+        scope = factory.context or context
+        previous = scope._get_current()
+        scope._set_current(scope)
+        try:
             component = factory.factory()
+            if inspect.isawaitable(component):
+                component = await component
+        finally:
+            scope._set_current(previous)
 
-            assert not inspect.isawaitable(
-                component
-            ), "Using an awaitable factory in synchronous code."
+        scope._components.fill(factory.resolved_types, component)
+        return component
 
-            context.components.update(
-                {type_: component for type_ in factory.resolved_types}
-            )
+    def _resolve_component(self, context: Context, type_: Type[T]) -> T:
+        # Resolve against an already fetched context so callers that
+        # resolve several components only read the context var once.
+        component = context._components.get(type_, UNSET)
+        if component is UNSET:
+            component = self._materialize(context, context._factories[type_])
+        return cast(T, component)
 
+    async def _resolve_component_async(self, context: Context, type_: Type[T]) -> T:
+        component = context._components.get(type_, UNSET)
+        if component is UNSET:
+            factory = context._factories[type_]
+            component = await self._materialize_async(context, factory)
         return cast(T, component)
 
-    async def get_component_async(self, type_: Type[T]) -> T:
+    def get_component(self, type_: Type[T]) -> T:
         """
         Get a component from the injector's current scope. Materialize
         it using a factory if necessary.
 
-        Use this method if the component's factory function returns an
-        `Awaitable`.
+        Note that it is an error to use this function to get a
+        component that has a factory that returns an `Awaitable`.
 
         :param type_: The type of the component to return.
         :return: The materialized component.
         """
 
-        components = self._context.components
-        try:
-            return components[type_]
-        except KeyError:
-            pass
-
-        factory = self._context.factories[type_]
-        assert factory.factory is not None
+        return self._resolve_component(self._context.current, type_)
 
-        with self._get_factory_context(factory) as context:
-            component_or_awaitable = factory.factory()
+    async def get_component_async(self, type_: Type[T]) -> T:
+        """
+        Get a component from the injector's current scope. Materialize
+        it using a factory if necessary.
 
-            if inspect.isawaitable(component_or_awaitable):
-                component = await cast(Awaitable[T], component_or_awaitable)
-            else:
-                component = cast(T, component_or_awaitable)
+        Use this method if the component's factory function returns an
+        `Awaitable`.
 
-            context.components.update(
-                {type_: component for type_ in factory.resolved_types}
-            )
+        :param type_: The type of the component to return.
+        :return: The materialized component.
+        """
 
-        return component
+        return await self._resolve_component_async(self._context.current, type_)
 
     def scope(self) -> Context:
         """
@@ -345,6 +527,80 @@ class Injector:
 
         return Context(self._context)
 
+    def _compile_wrapper(
+        self,
+        f: Callable[..., T],
+        sig: inspect.Signature,
+        injectable: List[Tuple[str, int, Type[Any]]],
+        positional: Optional[int],
+        is_async: bool,
+    ) -> Callable[..., T]:
+        # Generate a wrapper with the injection plan unrolled. The types
+        # are passed in through the globals so equally shaped functions
+        # share the compiled code. Without a positional count, some
+        # parameters can't be passed by keyword so the arguments are
+        # bound to the signature first.
+        get = "await _resolve_async" if is_async else "_resolve"
+        namespace: Dict[str, Any] = {
+            "_get_current": self._context._get_current,
+            "_resolve": self._resolve_component,
+            "_resolve_async": self._resolve_component_async,
+            "_bind_partial": sig.bind_partial,
+            "_f": f,
+            "_UNSET": UNSET,
+        }
+
+        await_ = "await " if is_async else ""
+        lines = [f"{'async ' if is_async else ''}def wrapper(*args, **kwargs):"]
+        if injectable:
+            lines.append("    context = _get_current()")
+            lines.append("    factories = context._factories")
+            lines.append("    components = context._components._flatten()")
+            if positional is None:
+                target = "arguments"
+                lines.append("    bound = _bind_partial(*args, **kwargs)")
+                lines.append("    arguments = bound.arguments")
+                lines.append("    provided = len(arguments)")
+            else:
+                target = "kwargs"
+                if any(position < positional for _, position, _ in injectable):
+                    lines.append("    provided = len(args)")
+
+        conditions = []
+        for i, (name, position, type_) in enumerate(injectable):
+            namespace[f"_T{i}"] = type_
+            condition = f"{name!r} not in {target} and _T{i} in factories"
+            if positional is not None and position < positional:
+                condition = f"provided <= {position} and {condition}"
+            conditions.append(condition)
+
+        if len(injectable) > 1:
+            # Decide what to inject before any factory runs, a factory may
+            # register factories for the next parameters.
+            for i, condition in enumerate(conditions):
+                lines.append(f"    inject{i} = {condition}")
+            conditions = [f"inject{i}" for i in range(len(injectable))]
+
+        for i, (name, _, _) in enumerate(injectable):
+            lines.append(f"    if {conditions[i]}:")
+            lines.append(f"        component = components.get(_T{i}, _UNSET)")
+            lines.append("        if component is _UNSET:")
+            lines.append(f"            component = {get}(context, _T{i})")
+            if i < len(injectable) - 1:
+                # The factory may have registered components the next
+                # parameters depend on.
+                lines.append("            components = context._components._flatten()")
+            lines.append(f"        {target}[{name!r}] = component")
+
+        if injectable and positional is None:
+            # Only rebuild the arguments if something was injected.
+            lines.append("    if len(arguments) != provided:")
+            lines.append(f"        return {await_}_f(*bound.args, **bound.kwargs)")
+        lines.append(f"    return {await_}_f(*args, **kwargs)")
+
+        exec(_compile_source("\n".join(lines)), namespace)
+        return cast(Callable[..., T], functools.wraps(f)(namespace["wrapper"]))
+
     def inject(self, f: Callable[..., T]) -> Callable[..., T]:
         """
         This decorator will connect the injector to a function or
@@ -357,77 +613,175 @@ class Injector:
         :return: The decorated function.
         """
 
-        def replace_param(
-            sig: inspect.Signature, param: inspect.Parameter, type_: Type[Any]
-        ) -> inspect.Signature:
-            new_param = param.replace(annotation=type_)
-            return sig.replace(
-                parameters=[
-                    new_param if p is param else p for p in sig.parameters.values()
-                ]
-            )
+        sig = _get_signature(f)
+        is_async = inspect.iscoroutinefunction(f)
 
-        sig = inspect.signature(f)
+        # The injection plan only depends on the signature, build it once.
+        injectable = []
+        positional_kinds = (
+            inspect.Parameter.POSITIONAL_ONLY,
+            inspect.Parameter.POSITIONAL_OR_KEYWORD,
+        )
+        by_keyword = True
+        positional = 0
+        for position, param in enumerate(sig.parameters.values()):
+            if param.kind in positional_kinds:
+                positional += 1
+            elif param.kind is not inspect.Parameter.KEYWORD_ONLY:
+                # Never inject *args or **kwargs.
+                continue
+
+            annotation = param.annotation
+            if annotation is inspect.Parameter.empty:
+                continue
+            if param.kind is inspect.Parameter.POSITIONAL_ONLY:
+                # Can't be filled in by keyword, needs to be bound.
+                by_keyword = False
+            if isinstance(annotation, str):
+                # Unresolvable forward references are retried on call.
+                annotation = self._resolve_type(f, annotation) or annotation
+            injectable.append((param.name, position, annotation))
+
+        if not any(isinstance(type_, str) for _, _, type_ in injectable):
+            return self._compile_wrapper(
+                f, sig, injectable, positional if by_keyword else None, is_async
+            )
 
-        for name, param in sig.parameters.items():
-            if isinstance(param.annotation, str):
-                type_ = self._resolve_type(f, param.annotation)
-                if type_ is None:
+        get_current = self._context._get_current
+        resolve = self._resolve_component
+        resolve_async = self._resolve_component_async
+        # Once every forward reference resolves, calls are handed off to
+        # a generated wrapper.
+        compiled: List[Callable[..., Any]] = []
+
+        def resolve_forward_ref(i: int) -> Optional[Type[Any]]:
+            name, position, type_name = injectable[i]
+            type_ = self._resolve_type(f, type_name)
+            if type_ is not None:
+                injectable[i] = (name, position, type_)
+                if not any(isinstance(t, str) for _, _, t in injectable):
+                    compiled.append(
+                        self._compile_wrapper(
+                            f,
+                            sig,
+                            injectable,
+                            positional if by_keyword else None,
+                            is_async,
+                        )
+                    )
+            return type_
+
+        def bind_keywords(
+            context: Context, args: Tuple[Any, ...], kwargs: Dict[str, Any]
+        ) -> List[Tuple[str, Type[Any]]]:
+            # Every parameter can be passed by keyword, so anything that
+            # is missing can be injected into kwargs without binding.
+            factories = context._factories
+            provided = len(args)
+            components = []
+
+            for i, (name, position, type_) in enumerate(injectable):
+                if position < provided or name in kwargs:
                     continue
-                sig = replace_param(sig, param, type_)
 
-        def bind_arguments(
-            args: Iterable[Any], kwargs: Dict[str, Any]
-        ) -> Tuple[inspect.BoundArguments, Dict[str, Any]]:
-            nonlocal sig
+                if isinstance(type_, str):
+                    type_ = resolve_forward_ref(i)
+                    if type_ is None:
+                        continue
+
+                if type_ in factories:
+                    components.append((name, type_))
+
+            return components
 
-            factories = self._context.factories
+        def bind_arguments(
+            context: Context, args: Iterable[Any], kwargs: Dict[str, Any]
+        ) -> Tuple[inspect.BoundArguments, List[Tuple[str, Type[Any]]]]:
+            factories = context._factories
             bound = sig.bind_partial(*args, **kwargs)
-            components = {}
+            arguments = bound.arguments
+            components = []
 
-            for name, param in sig.parameters.items():
-                if (
-                    name in bound.arguments
-                    or param.annotation is inspect.Parameter.empty
-                ):
+            for i, (name, _, type_) in enumerate(injectable):
+                if name in arguments:
                     continue
 
-                if isinstance(param.annotation, str):
-                    type_ = self._resolve_type(f, param.annotation)
+                if isinstance(type_, str):
+                    type_ = resolve_forward_ref(i)
                     if type_ is None:
                         continue
-                    sig = replace_param(sig, param, type_)
-                else:
-                    type_ = param.annotation
 
                 if type_ in factories:
-                    components[name] = type_
+                    components.append((name, type_))
 
             return bound, components
 
+        if is_async:
+
+            @functools.wraps(f)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> T:
+                if compiled:
+                    return await cast(Awaitable[T], compiled[0](*args, **kwargs))
+                context = get_current()
+                if by_keyword:
+                    components = context._components._flatten()
+                    for name, type_ in bind_keywords(context, args, kwargs):
+                        component = components.get(type_, UNSET)
+                        if component is UNSET:
+                            component = await resolve_async(context, type_)
+                            # The factory may have registered components the
+                            # next parameters depend on.
+                            components = context._components._flatten()
+                        kwargs[name] = component
+                    return await cast(Awaitable[T], f(*args, **kwargs))
+
+                bound, bind_components = bind_arguments(context, args, kwargs)
+                if not bind_components:
+                    return await cast(Awaitable[T], f(*args, **kwargs))
+                arguments = bound.arguments
+                components = context._components._flatten()
+                for name, type_ in bind_components:
+                    component = components.get(type_, UNSET)
+                    if component is UNSET:
+                        component = await resolve_async(context, type_)
+                        # The factory may have registered components the
+                        # next parameters depend on.
+                        components = context._components._flatten()
+                    arguments[name] = component
+                return await cast(Awaitable[T], f(*bound.args, **bound.kwargs))
+
+            return async_wrapper
+
         @functools.wraps(f)
         def wrapper(*args: Any, **kwargs: Any) -> T:
-            bound, bind_components = bind_arguments(args, kwargs)
-            bound.arguments.update(
-                {
-                    name: self.get_component(type_)
-                    for name, type_ in bind_components.items()
-                }
-            )
+            if compiled:
+                return cast(T, compiled[0](*args, **kwargs))
+            context = get_current()
+            if by_keyword:
+                components = context._components._flatten()
+                for name, type_ in bind_keywords(context, args, kwargs):
+                    component = components.get(type_, UNSET)
+                    if component is UNSET:
+                        component = resolve(context, type_)
+                        # The factory may have registered components the
+                        # next parameters depend on.
+                        components = context._components._flatten()
+                    kwargs[name] = component
+                return f(*args, **kwargs)
+
+            bound, bind_components = bind_arguments(context, args, kwargs)
+            if not bind_components:
+                return f(*args, **kwargs)
+            arguments = bound.arguments
+            components = context._components._flatten()
+            for name, type_ in bind_components:
+                component = components.get(type_, UNSET)
+                if component is UNSET:
+                    component = resolve(context, type_)
+                    # The factory may have registered components the
+                    # next parameters depend on.
+                    components = context._components._flatten()
+                arguments[name] = component
             return f(*bound.args, **bound.kwargs)
 
-        @functools.wraps(f)
-        async def async_wrapper(*args: Any, **kwargs: Any) -> T:
-            bound, bind_components = bind_arguments(args, kwargs)
-            bound.arguments.update(
-                {
-                    name: await self.get_component_async(type_)
-                    for name, type_ in bind_components.items()
-                }
-            )
-            return await cast(Awaitable[T], f(*bound.args, **bound.kwargs))
-
-        if inspect.iscoroutinefunction(f):
-            return async_wrapper
-        else:
-            return wrapper
+        return wrapper